@@ -1,3 +1,5 @@
+# Thread-pooled fallback balancer. lbasync.py is the default; use this one only where aiohttp/asyncio is not an option.
+import itertools
 import logging
 import socket
 import threading
@@ -14,15 +16,21 @@ logger = logging.getLogger("load_balancer")
 HOST = '127.0.0.1'
 PORT = 9090
 thread_pool_workers = 50
+listen_backlog = 2048 # pending connections the kernel queues for accept(); capped by net.core.somaxconn
+recv_chunk_size = 65536
+
+RESP_502 = b"HTTP/1.1 502 Bad Gateway\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+RESP_503 = b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
 
 backend_servers = [('127.0.0.1', 8080), ('127.0.0.1', 8081), ('127.0.0.1', 8082)]
 
 healthy_servers = set(backend_servers.copy())
+# round-robin iterator over the healthy servers, or None when there are none; the health thread swaps in a new one whenever the set changes.
+# cycle.__next__ runs entirely in C under the GIL, so request threads can share it without a lock.
+healthy_selector = itertools.cycle(backend_servers)
 health_check_path = "/health"
 health_lock = threading.Lock()
-
-rr_index = 0
-rr_lock = threading.Lock()
+health_requests = {server: f"GET {health_check_path} HTTP/1.1\r\nHost: {server[0]}\r\nConnection: close\r\n\r\n".encode() for server in backend_servers} # encoded once, reused by every probe
 
 length_backend_servers = len(backend_servers)
 health_check_period = 10 # default 10 seconds
@@ -30,12 +38,10 @@ health_check_period = 10 # default 10 seconds
 def call_health_route(server):
   sock = None
   try:
-    request = f"GET {health_check_path} HTTP/1.1\r\nHost: {server[0]}\r\nConnection: close\r\n\r\n"
-
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.settimeout(5)
     sock.connect(server)
-    sock.sendall(request.encode())
+    sock.sendall(health_requests[server])
 
     response = sock.recv(4096).decode()
     logger.debug("Health response from %s: %s", server, response.splitlines()[0] if response else "<empty>")
@@ -47,6 +53,11 @@ def call_health_route(server):
     if sock:
       sock.close()
 
+def rebuild_selector():
+  global healthy_selector
+  healthy = tuple(s for s in backend_servers if s in healthy_servers)
+  healthy_selector = itertools.cycle(healthy) if healthy else None
+
 def updateHealthyServers():
   while (True):
     for server in backend_servers:
@@ -55,9 +66,11 @@ def updateHealthyServers():
         with health_lock:
           if is_healthy and server not in healthy_servers:
             healthy_servers.add(server)
+            rebuild_selector()
             logger.info("Server %s marked healthy", server)
           elif not is_healthy and server in healthy_servers:
             healthy_servers.remove(server)
+            rebuild_selector()
             logger.warning("Server %s marked unhealthy", server)
 
       except Exception as e:
@@ -66,46 +79,52 @@ def updateHealthyServers():
     time.sleep(health_check_period)
 
 def find_backend_server():
-  global rr_index
-  backend_server = None
-
-  with health_lock:
-    if len(healthy_servers) == 0:
-      return None
-    servers_list = list(healthy_servers)
-    servers_list_length = len(servers_list)
-  
-  rr_lock.acquire()
-  try:
-      rr_index %= servers_list_length
-      backend_server = servers_list[rr_index]
-      rr_index = (rr_index + 1) % servers_list_length
-  finally:
-    rr_lock.release()
-  return backend_server
+  selector = healthy_selector # read the shared reference once; the health thread may swap it at any time
+  if selector is None:
+    return None
+  return next(selector)
+
+
+def tune_socket(sock):
+  # send small writes immediately instead of waiting on Nagle's algorithm, and ack without the delayed-ack timer where supported (Linux)
+  sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+  # QUICKACK isn't sticky: the kernel can drop back to delayed acks, so this only covers the first exchange unless re-armed after each recv
+  if hasattr(socket, "TCP_QUICKACK"):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
 
 
 def handle_client(clientsocket, addr):
   backend_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  forwarded = False # set once the first response bytes have gone to the client
   try:
-    data_received = clientsocket.recv(4096)
+    tune_socket(clientsocket)
+    data_received = clientsocket.recv(recv_chunk_size)
 
     backend_server = find_backend_server()
     if backend_server is None:
       logger.error("No healthy backend available for client %s", addr)
-      clientsocket.sendall(b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nContent-Length: 0\r\n\r\n")
+      clientsocket.sendall(RESP_503)
       return
-    logger.info("Routing client %s to backend %s", addr, backend_server)
+    if logger.isEnabledFor(logging.DEBUG):
+      logger.debug("Routing client %s to backend %s", addr, backend_server)
     
     backend_socket.connect(backend_server)
+    tune_socket(backend_socket)
     backend_socket.sendall(data_received)
     while (1):
-      chunk = backend_socket.recv(4096)
+      chunk = backend_socket.recv(recv_chunk_size)
       if not chunk:
         break
+      forwarded = True
       clientsocket.sendall(chunk)
   except Exception as e:
     logger.exception("Error handling client %s", addr)
+    # once part of the response is out, a 502 would land inside it; closing is the only way to signal the truncation
+    if not forwarded:
+      try:
+        clientsocket.sendall(RESP_502)
+      except OSError:
+        pass # the client connection is what failed; the error is already logged above
 
   finally:
     if (clientsocket):
@@ -118,7 +137,7 @@ def handle_client(clientsocket, addr):
 def startMultiThreadServer():
   serversocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
   serversocket.bind((HOST, PORT))
-  serversocket.listen(100) #tells the Operating System how many unaccepted connections to keep in a queue before it starts refusing new people
+  serversocket.listen(listen_backlog) #tells the Operating System how many unaccepted connections to keep in a queue before it starts refusing new people
 
   logger.info("Load Balancer Server running on %s:%s", HOST, PORT)
   executor = ThreadPoolExecutor(max_workers=thread_pool_workers)
@@ -1,159 +1,583 @@
 import logging
 import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
 import sys
+import time
+from collections import Counter, defaultdict
 import aiohttp
 
+try:
+  import uvloop
+except ImportError: # uvloop is optional; fall back to the stock asyncio event loop
+  uvloop = None
+
 
 logging.basicConfig(
   level=logging.INFO,
-  format="%(asctime)s [%(levelname)s] %(message)s",
+  format="%(asctime)s [%(levelname)s] [pid %(process)d] %(message)s",
 )
 logger = logging.getLogger("load_balancer")
 
 HOST = '127.0.0.1'
 PORT = 9090
 
+RESP_502 = b"HTTP/1.1 502 Bad Gateway\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+RESP_503 = b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+RESP_504 = b"HTTP/1.1 504 Gateway Timeout\r\nConnection: close\r\nContent-Length: 0\r\n\r\n"
+
 backend_servers = [('127.0.0.1', 8080), ('127.0.0.1', 8081), ('127.0.0.1', 8082)]
 
 healthy_servers = set(backend_servers.copy())
+healthy_snapshot = tuple(backend_servers) # immutable copy of healthy_servers read by the request path; rebuilt only when the set changes
 health_check_path = "/health"
 state_lock = asyncio.Lock()
 
-rr_index = 0
+inflight = defaultdict(int) # requests currently being proxied to each backend
+backend_cooldowns = {} # backend -> monotonic time until which it's skipped after a failed connect
+backend_failure_cooldown = 1 # seconds; about how long the health checks take to re-probe a failing backend
+
+request_stats = Counter() # "requests", "errors" and "latency" (seconds) since the last summary
+stats_period = 5 # seconds between request summaries in the log
 
 length_backend_servers = len(backend_servers)
-health_check_period = 10 # default 10 seconds
+health_check_period = 10 # default 10 seconds; starting interval for a healthy backend
+health_check_max_period = 30 # a backend that keeps passing backs off up to this interval
+health_check_retry_period = 1 # an unhealthy backend is re-probed this often
+health_check_jitter = 0.1 # each interval is randomized by +-10% so probes from different workers don't line up
+worker_count = 1 # number of worker processes sharing the listening port
+listen_backlog = 2048 # pending connections the kernel queues for accept(); capped by net.core.somaxconn
+
+max_backend_connections = 64 # requests proxied to one backend at once; further requests wait for a slot instead of opening more sockets
+backend_semaphores = {server: asyncio.Semaphore(max_backend_connections) for server in backend_servers}
+backend_timeout = 30 # seconds a request may spend waiting for a slot plus talking to the backend before the client gets a 504
+
+backend_pool_size = max_backend_connections # idle keep-alive connections kept per backend; room for every connection the semaphore allows
+backend_pool_idle_timeout = 30 # seconds an idle pooled connection is kept before it's pruned
+backend_pools = {server: asyncio.Queue(maxsize=backend_pool_size) for server in backend_servers}
+idempotent_methods = frozenset((b"GET", b"HEAD", b"PUT", b"DELETE", b"OPTIONS")) # requests that may be replayed on a fresh backend connection
+
+read_chunk_size = 65536 # bytes read from the backend per call on the copy path
+
+splice_supported = hasattr(os, "splice") # Linux only, Python 3.10+
+splice_min_size = 65536 # bodies smaller than this are cheaper to copy than to splice
+splice_chunk_size = 65536 # default pipe capacity on Linux
+
+def get_header(lowered_headers, name):
+  """Return the value of header `name` (lowercase bytes) from an already-lowercased raw header block, or None if absent.
+
+  Works on the raw bytes with a single find() instead of decoding and splitting the block into lines.
+  Callers lowercase the block once and reuse it for every lookup.
+  """
+  start = lowered_headers.find(b"\r\n" + name + b":") # the request/status line comes first, so every header follows a CRLF
+  if start == -1:
+    return None
+  start += len(name) + 3
+  return lowered_headers[start:lowered_headers.find(b"\r\n", start)].strip()
+
+def parse_content_length(lowered_headers):
+  """Return the Content-Length of a lowercased header block, or None if it's missing or malformed."""
+  try:
+    value = get_header(lowered_headers, b"content-length")
+    return int(value) if value is not None else None
+  except ValueError:
+    return None
+
+def parse_status(headers):
+  """Return the status code from a raw response header block, or 0 if the status line is malformed."""
+  status_line = headers[:headers.find(b"\r\n")].split()
+  return int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else 0
+
+def is_keep_alive(lowered_headers):
+  """Whether a lowercased request/response header block allows the connection to be reused.
+
+  HTTP/1.1 connections are persistent unless `Connection: close` is sent;
+  HTTP/1.0 ones only when `Connection: keep-alive` is sent.
+  """
+  connection = get_header(lowered_headers, b"connection") or b""
+  if b"http/1.0" in lowered_headers[:lowered_headers.find(b"\r\n")]:
+    return b"keep-alive" in connection
+  return b"close" not in connection
+
+async def read_chunked_body(client_reader):
+  # read a Transfer-Encoding: chunked body, size lines and trailers included, so it is forwarded with its framing intact
+  body = bytearray()
+  while True:
+    size_line = await client_reader.readuntil(b"\r\n")
+    body += size_line
+    chunk_size = int(size_line.split(b";", 1)[0].strip(), 16)
+    if chunk_size == 0:
+      break
+    body += await client_reader.readexactly(chunk_size + 2) # chunk data plus its trailing CRLF
+
+  while True:
+    trailer_line = await client_reader.readuntil(b"\r\n")
+    body += trailer_line
+    if trailer_line == b"\r\n":
+      break
+  return bytes(body)
 
 async def read_full_request(client_reader):
   """Read request headers and body from the client.
 
-  Returns (headers_bytes, body_bytes). Bodies are read only when a
-  Content-Length header is present; otherwise body_bytes is empty.
+  Returns (headers_bytes, lowered_headers, body_bytes), where lowered_headers
+  is the header block lowercased once for header lookups. Chunked bodies are
+  read up to their last chunk and trailers, other bodies by Content-Length;
+  without either, body_bytes is empty.
   """
 
   headers = await client_reader.readuntil(b"\r\n\r\n")
+  lowered_headers = headers.lower()
 
-  content_length = 0
-  try:
-    header_text = headers.decode(errors="ignore")
-    for line in header_text.split("\r\n"):
-      if line.lower().startswith("content-length:"):
-        content_length = int(line.split(":", 1)[1].strip() or 0)
-        break
-  except Exception:
-    content_length = 0
+  # the backend reads to the end of the body before answering, so it has to be forwarded in full
+  if b"chunked" in (get_header(lowered_headers, b"transfer-encoding") or b""):
+    return headers, lowered_headers, await read_chunked_body(client_reader)
+
+  content_length = parse_content_length(lowered_headers) or 0
 
   body = b""
   if content_length > 0:
     body = await client_reader.readexactly(content_length)
 
-  return headers, body
+  return headers, lowered_headers, body
 
-async def call_health_route(server):
+def create_health_session():
+  # one pooled session for every probe, so health checks reuse keep-alive connections instead of reconnecting each time
+  connector = aiohttp.TCPConnector(limit=length_backend_servers, keepalive_timeout=60, enable_cleanup_closed=True)
+  return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=5))
+
+async def call_health_route(session, server):
   url = f"http://{server[0]}:{server[1]}{health_check_path}"
 
   try:
-    async with aiohttp.ClientSession() as session:
-
-      async with session.get(url, timeout=5) as response:
-        logger.info(f"Health response from {server}: {response.status}")
-        # can access response.headers, body, etc. here if needed for more detailed health checks
-      return response.status == 200
+    async with session.get(url) as response:
+      logger.debug("Health response from %s: %s", server, response.status)
+      # can access response.headers, body, etc. here if needed for more detailed health checks
+      await response.read() # consume the body so the connection is released back to the pool
+    return response.status == 200
   except Exception as e:
     logger.warning("Health check failed for %s: %s", server, e)
     return False
 
-async def updateHealthyServers():
+def next_health_interval(server, is_healthy, intervals):
+  # healthy backends double their interval up to the max; unhealthy ones are retried quickly and start over once they recover
+  if is_healthy:
+    interval = intervals[server]
+    intervals[server] = min(interval * 2, max(health_check_max_period, health_check_period))
+  else:
+    interval = health_check_retry_period
+    intervals[server] = health_check_period
+  return interval * random.uniform(1 - health_check_jitter, 1 + health_check_jitter)
+
+async def updateHealthyServers(session):
+  global healthy_snapshot
+  intervals = {server: health_check_period for server in backend_servers}
+  next_probe_at = {server: time.monotonic() for server in backend_servers}
+  while (True):
+    now = time.monotonic()
+    due = [server for server in backend_servers if next_probe_at[server] <= now]
+    # probe the due backends concurrently, so a round takes as long as the slowest probe instead of the sum of them
+    results = await asyncio.gather(*(call_health_route(session, server) for server in due), return_exceptions=True)
+
+    async with state_lock:
+      now = time.monotonic()
+      changed = False
+      for server, is_healthy in zip(due, results):
+        if isinstance(is_healthy, Exception):
+          logger.error("Unexpected error during health check for %s", server, exc_info=is_healthy)
+          next_probe_at[server] = now + health_check_retry_period
+          continue
+        if is_healthy and server not in healthy_servers:
+          healthy_servers.add(server)
+          logger.info("Server %s marked healthy", server)
+          changed = True
+        elif not is_healthy and server in healthy_servers:
+          healthy_servers.remove(server)
+          logger.warning("Server %s marked unhealthy", server)
+          changed = True
+        next_probe_at[server] = now + next_health_interval(server, is_healthy, intervals)
+      if changed:
+        healthy_snapshot = tuple(s for s in backend_servers if s in healthy_servers)
+
+    await asyncio.sleep(max(0, min(next_probe_at.values()) - time.monotonic()))
+
+def find_backend_server():
+  # power of two choices: sample two healthy backends and take the one with fewer requests in flight.
+  # everything here runs on the single event loop thread without awaiting, so no lock is needed.
+  servers = healthy_snapshot
+  if backend_cooldowns:
+    # a backend refusing connections fails fast, which would make it look least loaded; skip it until its cooldown ends
+    now = time.monotonic()
+    for server, until in list(backend_cooldowns.items()):
+      if until <= now:
+        del backend_cooldowns[server]
+    servers = tuple(s for s in servers if s not in backend_cooldowns)
+  if len(servers) == 0:
+    return None
+  if len(servers) == 1:
+    return servers[0]
+
+  first, second = random.sample(servers, 2)
+  return first if inflight[first] <= inflight[second] else second
+
+
+async def open_backend_connection(server):
+  # asyncio and uvloop already set TCP_NODELAY on their TCP transports; pooled connections also get
+  # SO_KEEPALIVE so the kernel notices ones whose backend went away
+  try:
+    reader, writer = await asyncio.open_connection(server[0], server[1])
+  except OSError:
+    backend_cooldowns[server] = time.monotonic() + backend_failure_cooldown
+    raise
+  writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+  return reader, writer
+
+async def acquire_backend_connection(server):
+  """Return (reader, writer, reused) for server, preferring an idle pooled connection over a new one."""
+  pool = backend_pools[server]
+  while not pool.empty():
+    reader, writer, _ = pool.get_nowait()
+    if not writer.is_closing() and not reader.at_eof():
+      return reader, writer, True
+    writer.close()
+
+  reader, writer = await open_backend_connection(server)
+  return reader, writer, False
+
+def release_backend_connection(server, reader, writer):
+  """Put a connection back into its backend's pool, or close it if it's unusable or the pool is full."""
+  pool = backend_pools[server]
+  if writer.is_closing() or reader.at_eof() or pool.full():
+    writer.close()
+    return
+  pool.put_nowait((reader, writer, time.monotonic()))
+
+async def prune_backend_pools():
   while (True):
-    for server in backend_servers:
+    await asyncio.sleep(backend_pool_idle_timeout)
+    cutoff = time.monotonic() - backend_pool_idle_timeout
+    for pool in backend_pools.values():
+      for _ in range(pool.qsize()):
+        reader, writer, idle_since = pool.get_nowait()
+        if idle_since < cutoff or writer.is_closing() or reader.at_eof():
+          writer.close()
+        else:
+          pool.put_nowait((reader, writer, idle_since))
+
+
+async def send_request(backend_reader, backend_writer, headers, body):
+  """Forward the client's request and return the backend's response headers.
+
+  The request is delimited by its Content-Length, so the write side is left
+  open (no write_eof) and the connection stays usable for the next request.
+  """
+  backend_writer.writelines((headers, body) if body else (headers,))
+  await backend_writer.drain()
+
+  return await backend_reader.readuntil(b"\r\n\r\n")
+
+async def drain_if_needed(writer):
+  # drain() costs a trip through the scheduler, so only await it once the transport buffer is close to its high-water mark
+  transport = writer.transport
+  if transport.get_write_buffer_size() > transport.get_write_buffer_limits()[1] * 0.75:
+    await writer.drain()
+
+async def relay_stream(backend_reader, client_writer, remaining=None):
+  # copy `remaining` bytes from backend to client, or everything until the backend closes when remaining is None.
+  # callers drain client_writer once the whole response is written.
+  while remaining is None or remaining > 0:
+    response_chunk = await backend_reader.read(read_chunk_size if remaining is None else min(read_chunk_size, remaining))
+    if not response_chunk:
+      if remaining is not None:
+        raise asyncio.IncompleteReadError(b"", remaining)
+      break
+    client_writer.write(response_chunk)
+    await drain_if_needed(client_writer)
+    if remaining is not None:
+      remaining -= len(response_chunk)
+
+async def wait_for_fd(add_callback, remove_callback, fd):
+  # wait until fd is readable/writable, via loop.add_reader/remove_reader or loop.add_writer/remove_writer
+  future = asyncio.get_running_loop().create_future()
+  add_callback(fd, lambda: future.done() or future.set_result(None))
+  try:
+    await future
+  finally:
+    remove_callback(fd)
+
+async def splice_stream(backend_writer, client_writer, remaining=None):
+  # move bytes backend socket -> pipe -> client socket inside the kernel, without copying them through Python
+  loop = asyncio.get_running_loop()
+  # the transports still own the original fds (and the loop refuses add_reader on those), so work on duplicates
+  src_fd = os.dup(backend_writer.get_extra_info("socket").fileno())
+  dst_fd = os.dup(client_writer.get_extra_info("socket").fileno())
+  pipe_r, pipe_w = os.pipe()
+  try:
+    while remaining is None or remaining > 0:
+      count = splice_chunk_size if remaining is None else min(splice_chunk_size, remaining)
       try:
-        is_healthy = await call_health_route(server)
-        async with state_lock:
-          if is_healthy and server not in healthy_servers:
-            healthy_servers.add(server)
-            logger.info("Server %s marked healthy", server)
-          elif not is_healthy and server in healthy_servers:
-            healthy_servers.remove(server)
-            logger.warning("Server %s marked unhealthy", server)
-
-      except Exception as e:
-        logger.exception("Unexpected error during health check for %s", server)
+        moved = os.splice(src_fd, pipe_w, count, flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+      except BlockingIOError:
+        await wait_for_fd(loop.add_reader, loop.remove_reader, src_fd)
+        continue
+      if moved == 0:
+        if remaining is not None:
+          raise asyncio.IncompleteReadError(b"", remaining)
         break
+      if remaining is not None:
+        remaining -= moved
+
+      while moved > 0:
+        try:
+          moved -= os.splice(pipe_r, dst_fd, moved, flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        except BlockingIOError:
+          await wait_for_fd(loop.add_writer, loop.remove_writer, dst_fd)
+  finally:
+    for fd in (pipe_r, pipe_w, src_fd, dst_fd):
+      os.close(fd)
 
-    await asyncio.sleep(health_check_period)
+def buffered_size(reader):
+  # StreamReader has no public way to ask how much it has buffered, so this reads its private _buffer
+  # (a bytearray in CPython's asyncio, which uvloop reuses). Revisit if asyncio's StreamReader internals change.
+  return len(reader._buffer)
 
-async def find_backend_server():
-  global rr_index
-  backend_server = None
-  async with state_lock:
-    if len(healthy_servers) == 0:
-      return None
-    servers_list = list(healthy_servers)
-    servers_list_length = len(servers_list)
-  
-    rr_index %= servers_list_length
-    backend_server = servers_list[rr_index]
-    rr_index = (rr_index + 1) % servers_list_length
+async def relay_body(backend_reader, backend_writer, client_writer, remaining=None):
+  """Forward a response body of `remaining` bytes (or until the backend closes when None).
+
+  On Linux, large bodies are spliced between the sockets; everything else
+  goes through relay_stream.
+  """
+  if not splice_supported or (remaining is not None and remaining < splice_min_size):
+    await relay_stream(backend_reader, client_writer, remaining)
+    return
+
+  # hand over whatever the StreamReader already buffered past the headers; read() returns it without suspending
+  buffered = buffered_size(backend_reader)
+  if buffered:
+    response_chunk = await backend_reader.read(buffered if remaining is None else min(buffered, remaining))
+    client_writer.write(response_chunk)
+    if remaining is not None:
+      remaining -= len(response_chunk)
+  if remaining == 0 or (remaining is None and backend_reader.at_eof()):
+    return
+
+  # stop the transport reading so the rest of the body stays in the socket for splice
+  backend_writer.transport.pause_reading()
+  try:
+    await client_writer.drain()
+    if client_writer.transport.get_write_buffer_size():
+      # bytes are still queued in the client transport; splicing now would reorder the stream
+      backend_writer.transport.resume_reading()
+      await relay_stream(backend_reader, client_writer, remaining)
+      return
+    await splice_stream(backend_writer, client_writer, remaining)
+  finally:
+    if not backend_writer.is_closing():
+      backend_writer.transport.resume_reading()
+
+async def relay_chunked(backend_reader, client_writer):
+  # copy a Transfer-Encoding: chunked body, chunk by chunk, up to and including the trailer section
+  while True:
+    size_line = await backend_reader.readuntil(b"\r\n")
+    client_writer.write(size_line)
+    chunk_size = int(size_line.split(b";", 1)[0].strip(), 16)
+    if chunk_size == 0:
+      break
+    await relay_stream(backend_reader, client_writer, chunk_size + 2) # chunk data plus its trailing CRLF
+
+  while True:
+    trailer_line = await backend_reader.readuntil(b"\r\n")
+    client_writer.write(trailer_line)
+    if trailer_line == b"\r\n":
+      break
+
+async def relay_response(request_headers, response_headers, backend_reader, backend_writer, client_writer):
+  """Forward the backend's response to the client.
+
+  Returns True if the response was delimited (bodiless, Content-Length or
+  chunked) and the backend connection can carry another request, False if
+  it had to be read until the backend closed it.
+
+  If relaying fails after the final status line was written, the client
+  connection is aborted before the error propagates: the client is already
+  reading this response, so an error status written now would be taken as
+  body bytes instead of showing up as a truncated response.
+  """
+  status = parse_status(response_headers)
+  while 100 <= status < 200 and status != 101:
+    # interim responses (100 Continue, 103 Early Hints) have no body; forward them and wait for the final one
+    client_writer.write(response_headers)
+    response_headers = await backend_reader.readuntil(b"\r\n\r\n")
+    status = parse_status(response_headers)
+  client_writer.write(response_headers)
+
+  try:
+    lowered_headers = response_headers.lower()
+    content_length = parse_content_length(lowered_headers)
+    if request_headers.startswith(b"HEAD ") or status in (204, 304):
+      reusable = is_keep_alive(lowered_headers)
+    elif b"chunked" in (get_header(lowered_headers, b"transfer-encoding") or b""):
+      await relay_chunked(backend_reader, client_writer)
+      reusable = is_keep_alive(lowered_headers)
+    elif content_length is not None:
+      await relay_body(backend_reader, backend_writer, client_writer, content_length)
+      reusable = is_keep_alive(lowered_headers)
+    else:
+      await relay_body(backend_reader, backend_writer, client_writer)
+      reusable = False
+
+    await client_writer.drain()
+  except BaseException:
+    client_writer.transport.abort()
+    raise
+  return reusable
+
+
+async def log_request_stats():
+  # per-request info logs are too costly at high request rates, so traffic is reported as a periodic summary instead
+  while (True):
+    await asyncio.sleep(stats_period)
+    requests = request_stats["requests"]
+    if requests:
+      logger.info("Handled %d requests (%d errors) in the last %ss, avg latency %.1f ms",
+                  requests, request_stats["errors"], stats_period, request_stats["latency"] / requests * 1000)
+    request_stats.clear()
 
-  return backend_server
 
+async def proxy_request(backend_server, headers, body, keep_alive, client_writer):
+  """Send the client's request to backend_server and relay the response back.
+
+  Holds one of the backend's connection slots for the whole exchange. The
+  backend connection goes back to the pool when both sides allow it and is
+  closed otherwise, including when the exchange is cancelled.
+  """
+  async with backend_semaphores[backend_server]: # backpressure: queue here rather than flood the backend with connections
+    backend_reader, backend_writer, reused = await acquire_backend_connection(backend_server)
+    reusable = False
+    try:
+      try:
+        response_headers = await send_request(backend_reader, backend_writer, headers, body)
+      except (asyncio.IncompleteReadError, ConnectionError):
+        if not reused or headers[:headers.find(b" ")] not in idempotent_methods:
+          raise
+        # the backend dropped the idle pooled connection before we noticed; retry once on a fresh one.
+        # the request may already have reached the backend, so only methods that are safe to repeat are retried
+        backend_writer.close()
+        backend_reader, backend_writer = await open_backend_connection(backend_server)
+        response_headers = await send_request(backend_reader, backend_writer, headers, body)
+
+      reusable = await relay_response(headers, response_headers, backend_reader, backend_writer, client_writer) and keep_alive
+    finally:
+      # hand the backend connection back without awaiting, so neither a client reset nor a timeout can leak it
+      if reusable:
+        release_backend_connection(backend_server, backend_reader, backend_writer)
+      else:
+        backend_writer.close()
+
+async def send_error_response(client_writer, response):
+  # relay_response aborts the client once the response is under way; after that there is nothing left to answer
+  if client_writer.is_closing():
+    return
+  try:
+    client_writer.write(response)
+    await client_writer.drain()
+  except Exception:
+    logger.exception("Failed to write error response")
 
 async def handle_client(client_reader, client_writer):
-  backend_reader = None
-  backend_writer = None
+  start = time.perf_counter()
+  backend_server = None
   try:
-    # find a healthy backend server to route the client's request to
-    backend_server =  await find_backend_server()
+    # read only request line + headers from client and forward
+    headers, lowered_headers, body = await read_full_request(client_reader)
+    keep_alive = is_keep_alive(lowered_headers)
+
+    # pick the backend only once the request is in hand, so a slow client doesn't count as load on a backend it hasn't reached
+    backend_server = find_backend_server()
 
     if backend_server is None:
       logger.error("No healthy backend available for client")
-      client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nContent-Length: 0\r\n\r\n")
+      request_stats["errors"] += 1
+      client_writer.write(RESP_503)
       await client_writer.drain()
       return
-    
-    logger.info("Routing client to backend %s", backend_server)
-
-    backend_reader, backend_writer = await asyncio.open_connection(backend_server[0], backend_server[1])
-
-    # read only request line + headers from client and forward
-    headers, body = await read_full_request(client_reader)
+    inflight[backend_server] += 1
 
-    backend_writer.write(headers)
-    if body:
-      backend_writer.write(body)
-    await backend_writer.drain()
-    backend_writer.write_eof() # signal to backend that request is complete
+    if logger.isEnabledFor(logging.DEBUG):
+      logger.debug("Routing client to backend %s", backend_server)
 
-    while True:
-      response_chunk = await backend_reader.read(4096)
-      if not response_chunk:
-        break
-      client_writer.write(response_chunk)
-      await client_writer.drain()
+    # the deadline covers waiting for a connection slot too, so a stalled backend can't hold its slots forever
+    await asyncio.wait_for(proxy_request(backend_server, headers, body, keep_alive, client_writer), backend_timeout)
+  except asyncio.TimeoutError:
+    logger.error("Backend %s did not answer within %ss", backend_server, backend_timeout)
+    request_stats["errors"] += 1
+    await send_error_response(client_writer, RESP_504)
   except Exception:
     # If anything goes wrong (connect failure, parse error, backend drop), return 502 instead of dropping the socket.
     logger.exception("Request handling failed")
-    try:
-      client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nConnection: close\r\nContent-Length: 0\r\n\r\n")
-      await client_writer.drain()
-    except Exception:
-      logger.exception("Failed to write 502 response")
+    request_stats["errors"] += 1
+    await send_error_response(client_writer, RESP_502)
   finally:
+    request_stats["requests"] += 1
+    request_stats["latency"] += time.perf_counter() - start
+    if backend_server is not None:
+      inflight[backend_server] -= 1
     client_writer.close()
-    await client_writer.wait_closed()
-    if backend_writer:
-      backend_writer.close()
-      await backend_writer.wait_closed()
+    try:
+      await client_writer.wait_closed()
+    except ConnectionError:
+      pass # the client went away first; nothing left to clean up
 
 
 
 async def main():
-  asyncio.create_task(updateHealthyServers()) # start the health check loop in the background
+  health_session = create_health_session()
+  health_task = asyncio.create_task(updateHealthyServers(health_session)) # start the health check loop in the background
+  prune_task = asyncio.create_task(prune_backend_pools())
+  stats_task = asyncio.create_task(log_request_stats())
 
-  server = await asyncio.start_server(handle_client, HOST, PORT) # each client who connects will get their own coroutine to handle the request, allowing for concurrent handling of multiple clients without blocking the main server loop.
-  
-  async with server: # ensures that the server is properly closed when the main function exits, even if an error occurs. It manages the server's lifecycle, starting it when entering the block and ensuring it is shut down gracefully when exiting.
-    await server.serve_forever()
+  try:
+    # with several workers every process binds its own listener with SO_REUSEPORT and the kernel spreads accepts across them
+    server = await asyncio.start_server(handle_client, HOST, PORT, backlog=listen_backlog, reuse_port=worker_count > 1) # each client who connects will get their own coroutine to handle the request, allowing for concurrent handling of multiple clients without blocking the main server loop.
+
+    async with server: # ensures that the server is properly closed when the main function exits, even if an error occurs. It manages the server's lifecycle, starting it when entering the block and ensuring it is shut down gracefully when exiting.
+      await server.serve_forever()
+  finally:
+    health_task.cancel()
+    prune_task.cancel()
+    stats_task.cancel()
+    await health_session.close()
+
+
+def install_event_loop_policy():
+  # uvloop is a drop-in libuv-based event loop that is considerably faster than the default one for socket-heavy workloads.
+  if uvloop is None:
+    logger.info("uvloop not installed, using the default asyncio event loop")
+    return
+  asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+  logger.info("Using uvloop event loop")
+
+
+def default_worker_count():
+  # Linux load-balances SO_REUSEPORT listeners across processes; other platforms either lack it or hand every connection to one socket
+  if sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT"):
+    return os.cpu_count() or 1
+  return 1
+
+def run_worker(period, workers):
+  # each worker is its own process with its own event loop, health checks and balancing state
+  global health_check_period, worker_count
+  health_check_period = period
+  worker_count = workers
+
+  install_event_loop_policy()
+  try:
+    asyncio.run(main())
+  except KeyboardInterrupt:
+    pass
 
 
 if __name__ == "__main__":
@@ -161,6 +585,28 @@ if __name__ == "__main__":
     health_check_period = int(sys.argv[1])
   health_check_period = max(1, health_check_period) 
 
-  asyncio.run(main())
+  if len(sys.argv) > 2:
+    worker_count = int(sys.argv[2])
+  else:
+    worker_count = default_worker_count()
+  worker_count = max(1, worker_count)
+
+  if worker_count == 1:
+    run_worker(health_check_period, worker_count)
+  else:
+    logger.info("Starting %s worker processes on %s:%s", worker_count, HOST, PORT)
+    workers = [multiprocessing.Process(target=run_worker, args=(health_check_period, worker_count)) for _ in range(worker_count)]
+    for worker in workers:
+      worker.start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0)) # make `kill` unwind through the finally below too
+    try:
+      for worker in workers:
+        worker.join()
+    except KeyboardInterrupt:
+      logger.info("Shutting down the load balancer workers")
+    finally:
+      for worker in workers:
+        worker.terminate()
+        worker.join()
 
 
@@ -1,24 +1,38 @@
+import os
 import socket
 
 HOST = '127.0.0.1'
 PORT = 9090
 
+BODY = "Reply from Backend Server!!"
+# the reply never changes, so it's built and encoded once instead of on every request
+RESP_200 = (
+    "HTTP/1.1 200 OK\r\n"
+    "Content-Type: text/plain\r\n"
+    f"Content-Length: {len(BODY)}\r\n"
+    "Connection: close\r\n"
+    "\r\n"
+    f"{BODY}"
+).encode("utf-8")
+
+# on Linux keep a copy in an in-memory file so sendfile() can push it without copying it through Python
+resp_fd = None
+if hasattr(os, "memfd_create"):
+    resp_fd = os.memfd_create("singularbackend-response")
+    os.write(resp_fd, RESP_200)
+
+def send_response(clientsocket):
+    if resp_fd is None:
+        clientsocket.sendall(RESP_200)
+        return
+    offset = 0
+    while offset < len(RESP_200):
+        offset += os.sendfile(clientsocket.fileno(), resp_fd, offset, len(RESP_200) - offset)
+
 def handle_client(clientsocket, addr):
     try:
-        data_received = clientsocket.recv(4096).decode(errors='replace')
-        print(f"Received request from {addr}:\n{data_received}")
-
-        body = "Reply from Backend Server!!"
-        resp = (
-            "HTTP/1.1 200 OK\r\n"
-            "Content-Type: text/plain\r\n"
-            f"Content-Length: {len(body)}\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            f"{body}"
-        )
-        clientsocket.sendall(resp.encode("utf-8"))
-
+        clientsocket.recv(4096) # the request itself is ignored; every request gets the same reply
+        send_response(clientsocket)
 
     except Exception as e:
         print(f"Error handling client {addr}: {e}")
@@ -29,7 +43,7 @@ def handle_client(clientsocket, addr):
 def startBEServer():
     socketserver = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     socketserver.bind((HOST, PORT))
-    socketserver.listen(100)
+    socketserver.listen(2048)
 
     print(f"Backend Server running on {HOST}:{PORT}")
     try: